@@ -0,0 +1,55 @@
+"""Build a cohort report from synthetic scores with
+:mod:`djuintra.analytics`.
+
+Usage::
+
+    $ python benchmarks/analytics_cohort.py [students]
+
+"""
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                os.pardir))
+
+from djuintra import Score, Scores, Semester
+from djuintra.analytics import GRADES, ScoreTable
+
+
+def make_scores(rng, courses):
+    semesters = []
+    for year in range(2011, 2015):
+        for smt in (1, 2):
+            semesters.append(Semester(
+                title='{0}-{1}'.format(year, smt),
+                scores=(Score(code, code, float(rng.choice((1, 2, 3))),
+                              rng.choice(GRADES))
+                        for code in rng.sample(courses, 6))))
+    return Scores(averagescore=0.0, semesters=semesters)
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+    rng = random.Random(0)
+    courses = ['{0:06d}'.format(i) for i in range(2000)]
+    records = [('{0:08d}'.format(i), make_scores(rng, courses))
+               for i in range(count)]
+
+    started = time.time()
+    table = ScoreTable.from_scores(records)
+    loaded = time.time()
+    table.student_summary()
+    table.semester_summary()
+    table.course_summary()
+    table.grade_distribution()
+    finished = time.time()
+
+    print('{0:,} students, {1:,} scores'.format(count, len(table)))
+    print('load: {0:.2f}s, aggregate: {1:.2f}s'.format(
+        loaded - started, finished - loaded))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,69 @@
+"""Compare :mod:`djuintra.codec` with pickle and JSON for size and speed.
+
+Usage::
+
+    $ python benchmarks/codec_size_speed.py [rows]
+
+"""
+import json
+import os
+import pickle
+import random
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                os.pardir))
+
+from djuintra import TimePlace, TimeTable, codec
+
+
+def make_timetables(count):
+    rng = random.Random(0)
+    profnames = [u'교수{0}'.format(idx) for idx in range(300)]
+    classnames = [u'과목{0}'.format(idx) for idx in range(1500)]
+    divisions = [u'교양필수', u'교양선택', u'전공필수', u'전공선택']
+    return [TimeTable(
+        grade=rng.choice((None, 1, 2, 3, 4)),
+        division=rng.choice(divisions),
+        code='{0:06d}'.format(rng.randrange(1500)),
+        classcode='{0:02d}'.format(rng.randrange(1, 10)),
+        classtype=u'이론',
+        classname=rng.choice(classnames),
+        score=rng.choice((1, 2, 3)),
+        time=rng.choice((1, 2, 3)),
+        minor=u'',
+        profname=rng.choice(profnames),
+        times=[TimePlace(u'월{0}'.format(rng.randrange(1, 10)),
+                         u'{0}관{1}호'.format(rng.randrange(1, 30),
+                                             rng.randrange(100, 600)))
+               for _ in range(rng.choice((1, 2, 3)))],
+        maxstudents=rng.choice((30, 40, 60, 120)),
+        available=u'Y',
+    ) for _ in range(count)]
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    timetables = make_timetables(count)
+
+    formats = (
+        ('djuintra.codec', codec.dumps, codec.loads),
+        ('pickle', lambda records: pickle.dumps(records, -1), pickle.loads),
+        ('json', lambda records: json.dumps(records).encode('utf-8'),
+         lambda data: json.loads(data.decode('utf-8'))),
+    )
+
+    print('{0:,} timetables'.format(count))
+    for name, dumps, loads in formats:
+        data = dumps(timetables)
+        encode = min(timeit.repeat(lambda: dumps(timetables),
+                                   number=1, repeat=5))
+        decode = min(timeit.repeat(lambda: loads(data), number=1, repeat=5))
+        print('{0:>15}: {1:>10,} bytes, encode {2:7.1f}ms, '
+              'decode {3:7.1f}ms'.format(
+                  name, len(data), encode * 1000, decode * 1000))
+
+
+if __name__ == '__main__':
+    main()
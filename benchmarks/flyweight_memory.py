@@ -0,0 +1,72 @@
+"""Compare memory usage of :class:`djuintra.DjuAgent` and
+:class:`djuintra.FlyweightAgent` for many idle accounts.
+
+Usage::
+
+    $ python benchmarks/flyweight_memory.py [count]
+
+:class:`fake_useragent.UserAgent` is replaced with a stub while measuring,
+because loading its data for every :class:`djuintra.DjuAgent` under
+:mod:`tracemalloc` takes a few minutes per thousand agents. Each agent still
+gets its own User-Agent string.
+
+"""
+import os
+import sys
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                os.pardir))
+
+import djuintra
+from djuintra import DjuAgent, FlyweightAgent
+
+
+class StubUserAgent(object):
+    """Stands in for :class:`fake_useragent.UserAgent` with a fixed Chrome
+    User-Agent string.
+
+    """
+
+    CHROME = ('Mozilla/5.0 (Windows NT 6.1; WOW64) AppleWebKit/537.36 '
+              '(KHTML, like Gecko) Chrome/37.0.2049.0 Safari/537.36')
+
+    @property
+    def chrome(self):
+        # A copy per call, as each agent of the real one owns its string.
+        return ''.join(list(self.CHROME))
+
+
+def measure(cls, count):
+    # Shared state is not per account, so create it before measuring.
+    FlyweightAgent.get_shared_session()
+
+    user_agent = djuintra.UserAgent
+    djuintra.UserAgent = StubUserAgent
+    try:
+        tracemalloc.start()
+        before = tracemalloc.take_snapshot()
+        agents = [cls(userid='{0:08d}'.format(i),
+                      login_auth='{0:032x}'.format(i))
+                  for i in range(count)]
+        after = tracemalloc.take_snapshot()
+        tracemalloc.stop()
+    finally:
+        djuintra.UserAgent = user_agent
+
+    size = sum(stat.size_diff for stat in after.compare_to(before, 'filename'))
+    del agents
+    return size
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+
+    for cls in (DjuAgent, FlyweightAgent):
+        size = measure(cls, count)
+        print('{0:>16}: {1:>12,} bytes total, {2:>8,.0f} bytes per agent'
+              .format(cls.__name__, size, float(size) / count))
+
+
+if __name__ == '__main__':
+    main()
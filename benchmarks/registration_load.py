@@ -0,0 +1,323 @@
+# -*- coding: utf-8 -*-
+"""Load test of the course registration flow against a local stand-in of
+the intranet.
+
+Each simulated account logs in and calls
+:meth:`djuintra.DjuAgent.register_course_recurse` repeatedly. Concurrency is
+doubled each level until ``--max-accounts``. For each level, this script
+reports requests per second, a latency histogram and client CPU time per
+request, and at the end the levels where throughput saturates and where it
+drops. Outcomes count attempts whose courses were all registered (``ok``),
+attempts where some courses were rejected and registered again without them
+(``rejected``) and the total number of rejected courses.
+
+The stand-in server runs in another process so its CPU time is not counted.
+
+Usage::
+
+    $ python benchmarks/registration_load.py --max-accounts 64 --duration 5
+
+"""
+import argparse
+import bisect
+import multiprocessing
+import os
+import random
+import sys
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from multiprocessing.pool import ThreadPool
+from urllib.parse import parse_qs, urlsplit
+
+import requests
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                os.pardir))
+
+from djuintra import DjuAgent, FlyweightAgent, RegisterError
+
+
+#: Courses rejected during the current attempt of each thread.
+attempt = threading.local()
+
+BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, float('inf'))
+
+LOGIN_PAGE = u"<html><script>self.location='/';</script></html>"
+
+COURSE_PAGE = u"""<html><body><form name="Do_Action">
+<input type="hidden" name="h_dept_cd" value="00000">
+<input type="hidden" name="h_class_div" value="1">
+<input type="hidden" name="old_curi_nums" value="">
+<input type="hidden" name="old_course_clses" value="">
+</form></body></html>"""
+
+ERROR_PAGE = u"""<html><body><table><tr>
+<td>에러코드 : {code}</td><td></td><td></td>
+<td>{msg}<br>다시 시도하세요.</td>
+</tr></table></body></html>"""
+
+RESULT_PAGE = u"""<html><body><div>
+<table></table><table></table><table></table>
+<table><tbody><tr><td>신청</td></tr><tr><td>결과</td></tr>{rows}</tbody></table>
+</div></body></html>"""
+
+RESULT_ROW = u"""<tr><td><input size="6" value="{code}">
+<input size="2" value="{cls}"></td></tr>
+<tr><td{attr}>{msg}</td></tr>"""
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    """Mimics the login, course page and course registration of the
+    intranet.
+
+    Course page returns an error code page by ``error_rate``, and each
+    course fails with red ``bgcolor`` by ``failure_rate``.
+
+    """
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True
+    error_rate = 0.05
+    failure_rate = 0.2
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        if random.random() < self.error_rate:
+            self.reply(ERROR_PAGE.format(code=99, msg=u'신청기간이 아닙니다.'))
+        else:
+            self.reply(COURSE_PAGE)
+
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        form = parse_qs(self.rfile.read(length).decode('utf-8'))
+        path = urlsplit(self.path).path
+
+        if path.endswith('sys.syd.syd01Svl03'):
+            self.reply(LOGIN_PAGE, {
+                'Set-Cookie': 'LOGIN_AUTH={0}; Path=/'.format(
+                    uuid.uuid4().hex),
+            })
+            return
+
+        rows = []
+        for idx in range(30):
+            code = form.get('curi_num{0}'.format(idx))
+            if not code:
+                continue
+            cls = form.get('course_cls{0}'.format(idx), [''])[0]
+            failed = random.random() < self.failure_rate
+            rows.append(RESULT_ROW.format(
+                code=code[0], cls=cls,
+                attr=' bgcolor="red"' if failed else '',
+                msg=u'정원초과' if failed else u'신청완료'))
+        self.reply(RESULT_PAGE.format(rows=u''.join(rows)))
+
+    def reply(self, body, headers=None):
+        body = body.encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/html; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def serve(port, ready, error_rate, failure_rate):
+    StandInHandler.error_rate = error_rate
+    StandInHandler.failure_rate = failure_rate
+    server = ThreadingHTTPServer(('127.0.0.1', port), StandInHandler)
+    server.daemon_threads = True
+    ready.set()
+    server.serve_forever()
+
+
+def local_agent_class(base, base_url):
+    """Make a subclass of ``base`` whose URLs point to ``base_url`` and
+    which counts rejected courses in :data:`attempt`.
+
+    """
+    def register_course(self, courses):
+        try:
+            return base.register_course(self, courses)
+        except RegisterError as e:
+            attempt.rejected += len(e.failed_courses or ())
+            raise
+
+    attrs = {'register_course': register_course}
+    for name in dir(base):
+        if name.startswith('URL_'):
+            url = getattr(base, name)
+            for scheme in ('http', 'https'):
+                url = url.replace(scheme + '://intra.dju.ac.kr', base_url)
+            attrs[name] = url
+    return type('Local' + base.__name__, (base,), attrs)
+
+
+class Recorder(object):
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.latencies = []
+
+    def hook(self, response, *args, **kwargs):
+        with self.lock:
+            self.latencies.append(response.elapsed.total_seconds() * 1000)
+
+    def reset(self):
+        with self.lock:
+            latencies, self.latencies = self.latencies, []
+        return latencies
+
+
+def simulate(agent, userid, deadline, courses):
+    outcomes = {}
+    while time.time() < deadline:
+        attempt.rejected = 0
+        try:
+            agent.login(userid, 'password')
+            agent.register_course_recurse(courses)
+        except RegisterError as e:
+            outcome = 'error {0}'.format(e.code)
+        except Exception as e:
+            outcome = type(e).__name__
+        else:
+            outcome = 'rejected' if attempt.rejected else 'ok'
+        outcomes[outcome] = outcomes.get(outcome, 0) + 1
+        outcomes['rejected courses'] = (outcomes.get('rejected courses', 0) +
+                                        attempt.rejected)
+    return outcomes
+
+
+def run_level(agents, duration, courses, recorder):
+    pool = ThreadPool(len(agents))
+    recorder.reset()
+    deadline = time.time() + duration
+    started = time.time()
+    cpu_started = time.process_time()
+
+    results = pool.starmap(simulate, [
+        (agent, '{0:08d}'.format(idx), deadline, courses)
+        for idx, agent in enumerate(agents)])
+
+    elapsed = time.time() - started
+    cpu = time.process_time() - cpu_started
+    pool.close()
+    pool.join()
+
+    outcomes = {}
+    for result in results:
+        for key, count in result.items():
+            outcomes[key] = outcomes.get(key, 0) + count
+
+    return recorder.reset(), elapsed, cpu, outcomes
+
+
+def percentile(latencies, ratio):
+    if not latencies:
+        return float('nan')
+    return latencies[min(len(latencies) - 1, int(len(latencies) * ratio))]
+
+
+def report(count, latencies, elapsed, cpu, outcomes):
+    latencies.sort()
+    rps = len(latencies) / elapsed
+    print('accounts={0:<5} requests={1:<7} rps={2:<9.1f} '
+          'cpu/request={3:.3f}ms'.format(
+              count, len(latencies), rps,
+              cpu * 1000 / max(len(latencies), 1)))
+    print('  latency p50={0:.1f}ms p95={1:.1f}ms p99={2:.1f}ms'.format(
+        percentile(latencies, 0.5), percentile(latencies, 0.95),
+        percentile(latencies, 0.99)))
+
+    histogram = [0] * len(BUCKETS)
+    for latency in latencies:
+        histogram[bisect.bisect_left(BUCKETS, latency)] += 1
+    lower = 0
+    for bound, hits in zip(BUCKETS, histogram):
+        if hits:
+            print('  {0:>5}-{1:<5}ms {2:>7} {3}'.format(
+                lower, bound, hits,
+                '#' * int(50 * hits / len(latencies))))
+        lower = bound
+    print('  outcomes: {0}'.format(', '.join(
+        '{0}={1}'.format(key, value)
+        for key, value in sorted(outcomes.items()))))
+    return rps
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--max-accounts', type=int, default=64)
+    parser.add_argument('--duration', type=float, default=5.0,
+                        help='seconds for each concurrency level')
+    parser.add_argument('--courses', type=int, default=6)
+    parser.add_argument('--error-rate', type=float, default=0.05)
+    parser.add_argument('--failure-rate', type=float, default=0.2)
+    parser.add_argument('--flyweight', action='store_true',
+                        help='use FlyweightAgent instead of DjuAgent')
+    parser.add_argument('--port', type=int, default=18080)
+    args = parser.parse_args()
+
+    ready = multiprocessing.Event()
+    server = multiprocessing.Process(
+        target=serve,
+        args=(args.port, ready, args.error_rate, args.failure_rate))
+    server.daemon = True
+    server.start()
+    ready.wait()
+
+    base_url = 'http://127.0.0.1:{0}'.format(args.port)
+    base = FlyweightAgent if args.flyweight else DjuAgent
+    agent_class = local_agent_class(base, base_url)
+    recorder = Recorder()
+
+    agents = [agent_class() for _ in range(args.max_accounts)]
+    if args.flyweight:
+        sessions = [FlyweightAgent.get_shared_session()]
+        sessions[0].mount('http://', requests.adapters.HTTPAdapter(
+            pool_maxsize=args.max_accounts))
+    else:
+        sessions = [agent.session for agent in agents]
+    for session in sessions:
+        session.hooks['response'].append(recorder.hook)
+
+    courses = [('{0:06d}'.format(idx), '01') for idx in range(args.courses)]
+
+    levels = []
+    count = 1
+    while count <= args.max_accounts:
+        latencies, elapsed, cpu, outcomes = run_level(
+            agents[:count], args.duration, courses, recorder)
+        levels.append((count, report(count, latencies, elapsed, cpu,
+                                     outcomes)))
+        count *= 2
+
+    server.terminate()
+
+    best = max(levels, key=lambda level: level[1])
+    print('peak: {0:.1f} rps with {1} accounts'.format(best[1], best[0]))
+    pairs = list(zip(levels, levels[1:]))
+    for (prev_count, prev_rps), (count, rps) in pairs:
+        if rps < prev_rps * 1.1:
+            print('throughput saturates at {0} accounts: doubling to {1} '
+                  'adds less than 10% ({2:.1f} -> {3:.1f} rps)'.format(
+                      prev_count, count, prev_rps, rps))
+            break
+    else:
+        print('throughput kept scaling up to {0} accounts'.format(
+            levels[-1][0]))
+    for (prev_count, prev_rps), (count, rps) in pairs:
+        if rps < prev_rps:
+            print('throughput degrades from {0} accounts '
+                  '({1:.1f} -> {2:.1f} rps)'.format(count, prev_rps, rps))
+            break
+    else:
+        print('throughput did not drop up to {0} accounts'.format(
+            levels[-1][0]))
+
+if __name__ == '__main__':
+    main()
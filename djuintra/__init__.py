@@ -8,13 +8,17 @@ import datetime
 import re
 import requests
 from collections import namedtuple
+try:
+    from http.cookiejar import DefaultCookiePolicy
+except ImportError:
+    from cookielib import DefaultCookiePolicy
 from fake_useragent import UserAgent
 from lxml import html
 
 from .util import get_photo_url
 
-__all__ = ('DjuAgent', 'Score', 'Scores', 'Semester', 'Schedule', 'TimePlace',
-           'TimeTable')
+__all__ = ('BaseAgent', 'DjuAgent', 'FlyweightAgent', 'Score', 'Scores',
+           'Semester', 'Schedule', 'TimePlace', 'TimeTable')
 __version__ = '0.1.2'
 
 
@@ -113,18 +117,15 @@ class Score(namedtuple('Score', ('code', 'title', 'point', 'score'))):
     pass
 
 
-class DjuAgent(object):
-    """Main class for using Dju intranet.
-
-    You can login with constructor if you gives ID and PW.
-
-    :param userid: User's ID for login
-    :type userid: :class:`str`
+class BaseAgent(object):
+    """Common API of agents.
 
-    :param userpw: User's password for login
-    :type userpw: :class:`str`
+    Subclasses provide ``session`` and store ``LOGIN_AUTH`` cookie with
+    :meth:`get_login_auth` and :meth:`set_login_auth`.
 
     """
+    __slots__ = ()
+
     URL_LOGIN_REFERER = 'http://intra.dju.ac.kr/dju/login/sycLoginSvl01.htm'
     URL_LOGIN = 'http://intra.dju.ac.kr/servlet/sys.syd.syd01Svl03'
     URL_CHANGE_PW = 'https://intra.dju.ac.kr/servlet/sys.syc.syc01Svl07'
@@ -150,18 +151,6 @@ class DjuAgent(object):
         'major': 2,
     }
 
-    def __init__(self, userid=None, userpw=None, login_auth=None):
-        self.session = requests.session()
-        ua = UserAgent()
-        self.session.headers.update({
-            'User-Agent': ua.chrome,
-        })
-
-        if login_auth:
-            self.set_login_auth(login_auth)
-        elif userid and userpw:
-            self.login(userid, userpw)
-
     def login(self, userid, userpw):
         """Login to Dju intranet.
 
@@ -211,14 +200,6 @@ class DjuAgent(object):
             except:
                 return None
 
-    def get_login_auth(self):
-        return self.session.cookies['LOGIN_AUTH']
-
-    def set_login_auth(self, login_auth):
-        requests.utils.add_dict_to_cookiejar(
-            self.session.cookies,
-            {'LOGIN_AUTH': login_auth})
-
     def get_photo_url(self):
         return get_photo_url(self.userid)
 
@@ -299,7 +280,7 @@ class DjuAgent(object):
             # FIXME: parse this to array
             _times = tr.xpath('td[11]//font')
             times = []
-            for i in xrange(0, len(_times), 2):
+            for i in range(0, len(_times), 2):
                 times.append(TimePlace(_times[i].text_content().strip(),
                              _times[i+1].text_content().strip()))
             maxstudents = int(tr.find('td[12]').text_content().strip())
@@ -454,45 +435,81 @@ class DjuAgent(object):
             raise RegisterError(error_msgs, 0, failed_courses)
 
     def register_course_recurse(self, courses):
+        """Register courses, leaving out courses rejected by the intranet
+        and registering the rest again.
+
+        :param courses: a list of tuples like [('xxxxxx', 'yy'),].
+        :type courses: :class:`collections.Sequence`
+
+        :returns: rejected courses
+        :rtype: :class:`list`
+
+        """
         courses = set(courses)
+        rejected = []
         for retry_count in range(len(courses)):
             try:
                 self.register_course(courses)
             except RegisterError as e:
-                if not hasattr(e, 'failed_courses'):
+                if not e.failed_courses:
                     raise e
                 courses -= set(e.failed_courses)
+                rejected.extend(e.failed_courses)
             else:
                 break
+        return rejected
 
     def register_toeic(self):
         """Register simulated toeic
         """
 
+        self.submit_toeic(self.prepare_toeic())
+
+    def prepare_toeic(self):
+        """Scrape the application form of simulated toeic.
+
+        :returns: action url and data of the form for :meth:`submit_toeic`
+        :rtype: :class:`tuple`
+
+        """
+
         content = self.session.get(self.URL_TOEIC).text
 
         if 'Do_Save' not in content:
             errorcode, msg = self._get_error_code(content)
             raise Exception(msg)
 
-        tree = html.fromstring(content)
+        tree = html.fromstring(content, base_url=self.URL_TOEIC)
         form = tree.find('*//form')
 
         if not form:
             error_msg = tree.find('*//table/tr[3]').text_content().strip()
             raise Exception(error_msg)
 
+        data = {
+            'year': tree.find('*//input[@name="year"]').value,
+            'smt': tree.find('*//input[@name="smt"]').value,
+            'student_cd': tree.find('*//input[@name="student_cd"]').value,
+            'curi_num': tree.find('*//input[@name="curi_num"]').value,
+            'opt': tree.find('*//input[@name="opt"]').value,
+            'dt': tree.find('*//input[@name="dt"]').value,
+            'gbn': tree.find('*//input[@name="gbn"]').value,
+        }
+
+        return (form.action, data)
+
+    def submit_toeic(self, form):
+        """Submit the application form of simulated toeic.
+
+        :param form: action url and data from :meth:`prepare_toeic`
+        :type form: :class:`tuple`
+
+        """
+
+        action, data = form
         content = self.session.post(
-            form.action,
-            data={
-                'year': tree.find('*//input[@name="year"]').value,
-                'smt': tree.find('*//input[@name="smt"]').value,
-                'student_cd': tree.find('*//input[@name="student_cd"]').value,
-                'curi_num': tree.find('*//input[@name="curi_num"]').value,
-                'opt': tree.find('*//input[@name="opt"]').value,
-                'dt': tree.find('*//input[@name="dt"]').value,
-                'gbn': tree.find('*//input[@name="gbn"]').value,
-            },
+            action,
+            data=data,
             headers={'referer': self.URL_TOEIC}).text
 
         if 'error.jpg' in content:
@@ -548,6 +565,141 @@ class DjuAgent(object):
         return (code, msg)
 
 
+class DjuAgent(BaseAgent):
+    """Main class for using Dju intranet.
+
+    You can login with constructor if you gives ID and PW.
+
+    :param userid: User's ID for login
+    :type userid: :class:`str`
+
+    :param userpw: User's password for login
+    :type userpw: :class:`str`
+
+    """
+
+    def __init__(self, userid=None, userpw=None, login_auth=None):
+        self.session = requests.session()
+        ua = UserAgent()
+        self.session.headers.update({
+            'User-Agent': ua.chrome,
+        })
+
+        if login_auth:
+            self.set_login_auth(login_auth)
+        elif userid and userpw:
+            self.login(userid, userpw)
+
+    def get_login_auth(self):
+        return self.session.cookies['LOGIN_AUTH']
+
+    def set_login_auth(self, login_auth):
+        requests.utils.add_dict_to_cookiejar(
+            self.session.cookies,
+            {'LOGIN_AUTH': login_auth})
+
+
+class FlyweightAgent(BaseAgent):
+    """Lightweight agent for keeping many idle accounts.
+
+    Instead of owning a whole session, it only keeps the user id and the
+    ``LOGIN_AUTH`` cookie. Every :class:`FlyweightAgent` shares one
+    connection pool and the cookie is injected for each request.
+
+    :param userid: User's ID for login
+    :type userid: :class:`str`
+
+    :param userpw: User's password for login
+    :type userpw: :class:`str`
+
+    :param login_auth: ``LOGIN_AUTH`` cookie of already logged in session
+    :type login_auth: :class:`str`
+
+    """
+    __slots__ = ('_userid', '_login_auth')
+
+    #: Connections kept in the shared pool for each host.
+    POOL_MAXSIZE = 100
+
+    _shared_session = None
+
+    def __init__(self, userid=None, userpw=None, login_auth=None):
+        self._login_auth = login_auth
+
+        if login_auth:
+            if userid:
+                self._userid = userid
+        elif userid and userpw:
+            self.login(userid, userpw)
+
+    @classmethod
+    def get_shared_session(cls):
+        """Get the session which is shared by every flyweight agent.
+
+        Its cookie jar never stores any cookie, so one account's cookies
+        can not leak to the others.
+
+        :rtype: :class:`requests.Session`
+
+        """
+        if FlyweightAgent._shared_session is None:
+            session = requests.session()
+            session.cookies = requests.cookies.RequestsCookieJar(
+                policy=DefaultCookiePolicy(allowed_domains=[]))
+            for prefix in ('http://', 'https://'):
+                session.mount(prefix, requests.adapters.HTTPAdapter(
+                    pool_maxsize=FlyweightAgent.POOL_MAXSIZE))
+            session.headers.update({
+                'User-Agent': UserAgent().chrome,
+            })
+            FlyweightAgent._shared_session = session
+        return FlyweightAgent._shared_session
+
+    @property
+    def session(self):
+        return _AuthSession(self)
+
+    def get_login_auth(self):
+        if self._login_auth is None:
+            raise KeyError('LOGIN_AUTH')
+        return self._login_auth
+
+    def set_login_auth(self, login_auth):
+        self._login_auth = login_auth
+
+
+class _AuthSession(object):
+    """Session-like proxy which sends requests via the shared session with
+    the cookie of the :class:`FlyweightAgent`.
+
+    """
+    __slots__ = ('agent',)
+
+    def __init__(self, agent):
+        self.agent = agent
+
+    def request(self, method, url, **kwargs):
+        cookies = dict(kwargs.pop('cookies', None) or {})
+        if self.agent._login_auth:
+            cookies['LOGIN_AUTH'] = self.agent._login_auth
+
+        response = self.agent.get_shared_session().request(
+            method, url, cookies=cookies, **kwargs)
+
+        for r in response.history + [response]:
+            login_auth = r.cookies.get('LOGIN_AUTH')
+            if login_auth:
+                self.agent._login_auth = login_auth
+
+        return response
+
+    def get(self, url, **kwargs):
+        return self.request('GET', url, **kwargs)
+
+    def post(self, url, data=None, **kwargs):
+        return self.request('POST', url, data=data, **kwargs)
+
+
 class RegisterError(Exception):
 
     def __init__(self, msg, code, failed_courses=None):
@@ -0,0 +1,233 @@
+""":mod:`djuintra.analytics` --- Grade analytics for many students
+~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+This module loads lots of :class:`djuintra.Scores` into columnar NumPy arrays
+and computes GPAs, credit totals and grade distributions in batch.
+
+It requires NumPy. Install it with ``pip install dju-intranet[analytics]``.
+
+"""
+from collections import namedtuple
+
+import numpy as np
+
+__all__ = ('GRADES', 'GRADE_POINTS', 'PASSED', 'UNKNOWN', 'ScoreTable',
+           'StudentSummary', 'SemesterSummary', 'CourseSummary', 'grade_code')
+
+
+#: Letter grades. Index of the grade is used as its code.
+GRADES = ('A+', 'A0', 'B+', 'B0', 'C+', 'C0', 'D+', 'D0', 'F', 'P', 'NP')
+
+#: Code for grades not in :data:`GRADES`.
+UNKNOWN = len(GRADES)
+
+#: Grade points of each grade code. Not graded courses are ``nan``.
+GRADE_POINTS = np.array([4.5, 4.0, 3.5, 3.0, 2.5, 2.0, 1.5, 1.0, 0.0,
+                         np.nan, np.nan, np.nan])
+
+#: Whether the credits of each grade code are earned.
+PASSED = np.array([True] * 8 + [False, True, False, False])
+
+_GRADE_CODES = dict((grade, code) for code, grade in enumerate(GRADES))
+_GRADE_CODES.update({
+    'A': _GRADE_CODES['A0'],
+    'B': _GRADE_CODES['B0'],
+    'C': _GRADE_CODES['C0'],
+    'D': _GRADE_CODES['D0'],
+    'S': _GRADE_CODES['P'],
+    'N': _GRADE_CODES['NP'],
+    'U': _GRADE_CODES['NP'],
+})
+
+
+StudentSummary = namedtuple('StudentSummary', (
+    'students', 'credits', 'earned', 'gpa'))
+SemesterSummary = namedtuple('SemesterSummary', (
+    'students', 'semesters', 'credits', 'earned', 'gpa'))
+CourseSummary = namedtuple('CourseSummary', (
+    'courses', 'enrolled', 'gpa', 'distribution'))
+
+
+def grade_code(grade):
+    """Convert a letter grade to its code.
+
+    :param grade: Letter grade like ``'A+'``
+    :type grade: :class:`str`
+
+    :returns: Index of the grade in :data:`GRADES`, or :data:`UNKNOWN`
+    :rtype: :class:`int`
+
+    """
+    return _GRADE_CODES.get(grade.strip().upper(), UNKNOWN)
+
+
+class ScoreTable(object):
+    """Scores of many students as columnar arrays.
+
+    Each row is a :class:`djuintra.Score` of a student. ``student``,
+    ``semester`` and ``course`` are indices of :attr:`students`,
+    :attr:`semesters` and :attr:`courses`.
+
+    :param students: Student ids
+    :type students: :class:`collections.Sequence`
+
+    :param semesters: Semester titles
+    :type semesters: :class:`collections.Sequence`
+
+    :param courses: Course codes
+    :type courses: :class:`collections.Sequence`
+
+    :param student: Student index of each row
+    :type student: :class:`numpy.ndarray`
+
+    :param semester: Semester index of each row
+    :type semester: :class:`numpy.ndarray`
+
+    :param course: Course index of each row
+    :type course: :class:`numpy.ndarray`
+
+    :param credit: Credits of each row
+    :type credit: :class:`numpy.ndarray`
+
+    :param grade: Grade code of each row
+    :type grade: :class:`numpy.ndarray`
+
+    """
+
+    def __init__(self, students, semesters, courses,
+                 student, semester, course, credit, grade):
+        self.students = np.asarray(students, dtype=object)
+        self.semesters = np.asarray(semesters, dtype=object)
+        self.courses = np.asarray(courses, dtype=object)
+        self.student = np.asarray(student, dtype=np.int32)
+        self.semester = np.asarray(semester, dtype=np.int32)
+        self.course = np.asarray(course, dtype=np.int32)
+        self.credit = np.asarray(credit, dtype=np.float64)
+        self.grade = np.asarray(grade, dtype=np.int8)
+
+    @classmethod
+    def from_scores(cls, records):
+        """Load scores of many students.
+
+        :param records: pairs of student id and :class:`djuintra.Scores`.
+                        A :class:`dict` is also accepted.
+        :type records: :class:`collections.Iterable`
+
+        :rtype: :class:`ScoreTable`
+
+        """
+        if isinstance(records, dict):
+            records = records.items()
+
+        students = []
+        semester_index = {}
+        course_index = {}
+        # Codes of distinct letter grades, normalized by grade_code().
+        grade_codes = {}
+
+        student = []
+        semester = []
+        course = []
+        credit = []
+        grade = []
+
+        for student_id, scores in records:
+            student_idx = len(students)
+            students.append(student_id)
+            for sem in scores.semesters:
+                semester_idx = semester_index.setdefault(
+                    sem.title, len(semester_index))
+                for score in sem.scores:
+                    student.append(student_idx)
+                    semester.append(semester_idx)
+                    course.append(course_index.setdefault(
+                        score.code, len(course_index)))
+                    credit.append(score.point)
+                    try:
+                        code = grade_codes[score.score]
+                    except KeyError:
+                        code = grade_codes[score.score] = grade_code(
+                            score.score)
+                    grade.append(code)
+
+        return cls(students, _keys(semester_index), _keys(course_index),
+                   student, semester, course, credit, grade)
+
+    def __len__(self):
+        return len(self.grade)
+
+    def _aggregate(self, keys, size):
+        graded = ~np.isnan(GRADE_POINTS)[self.grade]
+        graded_credit = np.where(graded, self.credit, 0.0)
+        points = np.where(graded, GRADE_POINTS[self.grade], 0.0)
+
+        credits = np.bincount(keys, weights=self.credit, minlength=size)
+        earned = np.bincount(keys, weights=self.credit * PASSED[self.grade],
+                             minlength=size)
+        total = np.bincount(keys, weights=graded_credit * points,
+                            minlength=size)
+        weights = np.bincount(keys, weights=graded_credit, minlength=size)
+
+        with np.errstate(invalid='ignore', divide='ignore'):
+            gpa = np.where(weights > 0, total / weights, np.nan)
+
+        return credits, earned, gpa
+
+    def student_summary(self):
+        """Credits and GPA of each student.
+
+        :rtype: :class:`StudentSummary`
+
+        """
+        credits, earned, gpa = self._aggregate(self.student,
+                                               len(self.students))
+        return StudentSummary(self.students, credits, earned, gpa)
+
+    def semester_summary(self):
+        """Credits and GPA of each semester of each student.
+
+        :rtype: :class:`SemesterSummary`
+
+        """
+        keys = (self.student.astype(np.int64) * len(self.semesters) +
+                self.semester)
+        unique, inverse = np.unique(keys, return_inverse=True)
+        credits, earned, gpa = self._aggregate(inverse.ravel(), len(unique))
+        return SemesterSummary(
+            self.students[unique // len(self.semesters)],
+            self.semesters[unique % len(self.semesters)],
+            credits, earned, gpa)
+
+    def course_summary(self):
+        """Enrollments, mean grade point and grade distribution of each
+        course.
+
+        ``distribution`` is a matrix of courses by grade codes, including
+        :data:`UNKNOWN` as the last column.
+
+        :rtype: :class:`CourseSummary`
+
+        """
+        size = len(self.courses)
+        width = UNKNOWN + 1
+        _, _, gpa = self._aggregate(self.course, size)
+        enrolled = np.bincount(self.course, minlength=size)
+        distribution = np.bincount(
+            self.course.astype(np.int64) * width + self.grade,
+            minlength=size * width).reshape(size, width)
+        return CourseSummary(self.courses, enrolled, gpa, distribution)
+
+    def grade_distribution(self):
+        """Count of each grade code over all rows.
+
+        :rtype: :class:`numpy.ndarray`
+
+        """
+        return np.bincount(self.grade, minlength=UNKNOWN + 1)
+
+
+def _keys(index):
+    keys = [None] * len(index)
+    for key, idx in index.items():
+        keys[idx] = key
+    return keys
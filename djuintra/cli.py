@@ -0,0 +1,314 @@
+""":mod:`djuintra.cli` --- Command line bulk runner
+~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+``djuintra`` command runs bulk jobs over departments or accounts in
+parallel. Every job writes JSON lines to the output as soon as it is done
+and is recorded in the checkpoint file, so an interrupted run resumes
+without fetching finished jobs again. Failed jobs are not recorded and run
+again on resume, and the command exits with status 1.
+
+.. code-block:: console
+
+   $ djuintra timetables --year 2014 --semester 2 -j 8 \\
+         --checkpoint crawl.ckpt -o timetables.jsonl 00000 10100 10200
+   $ djuintra scores accounts.csv -j 16 --checkpoint scores.ckpt \\
+         -o scores.jsonl
+   $ djuintra register accounts.csv 000000-01 000001-02 -j 16
+
+Accounts are CSV rows of user id and password. For ``register``, an
+optional third column overrides courses, like ``000000-01 000001-02``.
+
+"""
+import argparse
+import csv
+import datetime
+import io
+import json
+import os
+import sys
+import time
+from multiprocessing.pool import ThreadPool
+
+from . import FlyweightAgent, RegisterError
+
+__all__ = ('main',)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog='djuintra', description='Bulk jobs for Dju intranet.')
+    subparsers = parser.add_subparsers(dest='command')
+    subparsers.required = True
+
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument('-j', '--workers', type=int, default=4,
+                        help='how many jobs run at once (default: 4)')
+    common.add_argument('-o', '--output', default='-',
+                        help='JSON lines output (default: stdout)')
+    common.add_argument('--checkpoint',
+                        help='file of finished jobs to resume from')
+
+    timetables = subparsers.add_parser(
+        'timetables', parents=[common], help='crawl timetables')
+    timetables.add_argument('--year', type=int,
+                            default=datetime.date.today().year)
+    timetables.add_argument('--semester', type=int, default=1,
+                            help='1 for spring, 2 for fall')
+    timetables.add_argument('--break', dest='isbreak', action='store_const',
+                            const=1, default=0, help='break semester')
+    timetables.add_argument(
+        '--category', default='all',
+        choices=sorted(FlyweightAgent.TIMETABLE_CATEGORIES))
+    timetables.add_argument('departcodes', nargs='*', default=['00000'],
+                            metavar='departcode')
+    timetables.set_defaults(func=run_timetables)
+
+    schedules = subparsers.add_parser(
+        'schedules', parents=[common], help='sync schedules')
+    schedules.add_argument('accounts', type=_read_accounts,
+                           help='CSV of an account to read schedules')
+    schedules.set_defaults(func=run_schedules)
+
+    scores = subparsers.add_parser(
+        'scores', parents=[common], help='export personal scores')
+    scores.add_argument('accounts', type=_read_accounts,
+                        help='CSV of accounts')
+    scores.set_defaults(func=run_scores)
+
+    register = subparsers.add_parser(
+        'register', parents=[common], help='register courses')
+    register.add_argument('accounts', type=_read_accounts,
+                          help='CSV of accounts')
+    register.add_argument('courses', nargs='*', metavar='code-classcode',
+                          help='courses for accounts without their own')
+    register.set_defaults(func=run_register)
+
+    args = parser.parse_args(argv)
+    return args.func(args)
+
+
+def run_timetables(args):
+    agent = FlyweightAgent()
+    category = FlyweightAgent.TIMETABLE_CATEGORIES[args.category]
+
+    def crawl(departcode):
+        return [_timetable_to_dict(timetable) for timetable
+                in agent.get_timetables(args.year, args.semester,
+                                        args.isbreak, departcode, category)]
+
+    jobs = [(departcode, departcode) for departcode in args.departcodes]
+    return Runner(args).run(jobs, crawl)
+
+
+def run_schedules(args):
+    if not args.accounts:
+        raise SystemExit('No account to read schedules')
+
+    def sync(account):
+        agent = FlyweightAgent(account[0], account[1])
+        return [schedule._asdict() for schedule in agent.get_schedules()]
+
+    return Runner(args).run([('schedules', args.accounts[0])], sync)
+
+
+def run_scores(args):
+
+    def export(account):
+        agent = FlyweightAgent(account[0], account[1])
+        scores = agent.get_personal_scores()
+        return [{
+            'userid': account[0],
+            'averagescore': scores.averagescore,
+            'semesters': [{
+                'title': semester.title,
+                'scores': [score._asdict() for score in semester.scores],
+            } for semester in scores.semesters],
+        }]
+
+    return Runner(args).run(
+        [(account[0], account) for account in args.accounts], export)
+
+
+def run_register(args):
+    default_courses = _parse_courses(args.courses)
+
+    def register(account):
+        courses = _parse_courses(account[2:]) or default_courses
+        if not courses:
+            raise ValueError('No courses to register')
+        agent = FlyweightAgent(account[0], account[1])
+        try:
+            rejected = agent.register_course_recurse(courses)
+        except RegisterError as e:
+            raise JobFailed(e, [
+                {'userid': account[0], 'error': str(e), 'code': e.code}])
+        if rejected:
+            e = RegisterError('Rejected {0} of {1} courses'.format(
+                len(rejected), len(courses)), 0, rejected)
+            raise JobFailed(e, [{
+                'userid': account[0], 'error': str(e), 'code': e.code,
+                'rejected': ['{0}-{1}'.format(*course) for course in rejected],
+            }])
+        return [{'userid': account[0], 'error': None}]
+
+    return Runner(args).run(
+        [(account[0], account) for account in args.accounts], register)
+
+
+class JobFailed(Exception):
+    """Raised by a job that failed but still has records to write. The
+    records are written, but the job is not recorded in the checkpoint.
+
+    :param error: Cause of the failure
+    :type error: :class:`Exception`
+
+    :param records: JSON serializable records
+    :type records: :class:`list`
+
+    """
+
+    def __init__(self, error, records):
+        super(JobFailed, self).__init__(error)
+        self.error = error
+        self.records = records
+
+
+class Runner(object):
+    """Run jobs on a thread pool, write their records as JSON lines and
+    record finished jobs in the checkpoint.
+
+    :param args: Parsed arguments with ``workers``, ``output`` and
+                 ``checkpoint``
+    :type args: :class:`argparse.Namespace`
+
+    """
+
+    def __init__(self, args):
+        self.workers = args.workers
+        self.output = args.output
+        self.checkpoint = args.checkpoint
+
+    def run(self, jobs, func):
+        """Run jobs not in the checkpoint.
+
+        :param jobs: Pairs of unique key and argument of ``func``
+        :type jobs: :class:`collections.Sequence`
+
+        :param func: Function returns a list of JSON serializable records.
+                     It may raise :exc:`JobFailed` to write records of a
+                     failed job.
+        :type func: :func:`callable`
+
+        :returns: exit status, 1 if any job failed
+        :rtype: :class:`int`
+
+        """
+        finished = self._read_checkpoint()
+        pending = [job for job in jobs if job[0] not in finished]
+        skipped = len(jobs) - len(pending)
+
+        def work(job):
+            key, arg = job
+            try:
+                return key, func(arg), None
+            except JobFailed as e:
+                return key, e.records, e.error
+            except Exception as e:
+                return key, [], e
+
+        started = time.time()
+        done = failed = records = 0
+        # Failed jobs of the previous run wrote records without checkpoint.
+        output = self._open_output(resume=bool(
+            self.checkpoint and os.path.exists(self.checkpoint)))
+        checkpoint = (io.open(self.checkpoint, 'a', encoding='utf-8')
+                      if self.checkpoint else None)
+        pool = ThreadPool(max(1, min(self.workers, len(pending) or 1)))
+        try:
+            for key, result, error in pool.imap_unordered(work, pending):
+                for record in result:
+                    output.write(json.dumps(
+                        record, ensure_ascii=False, default=_default))
+                    output.write(u'\n')
+                output.flush()
+                records += len(result)
+                if error is not None:
+                    failed += 1
+                    _log(u'{0}: {1}: {2}'.format(
+                        key, type(error).__name__, error))
+                    continue
+                if checkpoint:
+                    checkpoint.write(u'{0}\n'.format(key))
+                    checkpoint.flush()
+                done += 1
+        finally:
+            pool.terminate()
+            pool.join()
+            if checkpoint:
+                checkpoint.close()
+            if output is not sys.stdout:
+                output.close()
+
+        elapsed = time.time() - started
+        _log(u'{0} done, {1} skipped, {2} failed, {3} records in {4:.1f}s '
+             u'({5:.2f} jobs/s, {6:.1f} records/s)'.format(
+                 done, skipped, failed, records, elapsed,
+                 done / elapsed if elapsed else 0.0,
+                 records / elapsed if elapsed else 0.0))
+        return 1 if failed else 0
+
+    def _read_checkpoint(self):
+        if not self.checkpoint:
+            return set()
+        try:
+            with io.open(self.checkpoint, encoding='utf-8') as f:
+                return set(line.strip() for line in f if line.strip())
+        except IOError:
+            return set()
+
+    def _open_output(self, resume):
+        if self.output == '-':
+            return sys.stdout
+        return io.open(self.output, 'a' if resume else 'w', encoding='utf-8')
+
+
+def _read_accounts(path):
+    try:
+        with io.open(path, encoding='utf-8', newline='') as f:
+            return [[column.strip() for column in row]
+                    for row in csv.reader(f) if row and row[0].strip()]
+    except (IOError, OSError) as e:
+        raise argparse.ArgumentTypeError(
+            "can't open '{0}': {1}".format(path, e.strerror or e))
+    except UnicodeDecodeError as e:
+        raise argparse.ArgumentTypeError(
+            "can't read '{0}': {1}".format(path, e))
+
+
+def _parse_courses(values):
+    courses = []
+    for value in values:
+        for course in value.split():
+            code, _, cls = course.partition('-')
+            courses.append((code, cls))
+    return courses
+
+
+def _timetable_to_dict(timetable):
+    record = timetable._asdict()
+    record['times'] = [time_place._asdict() for time_place in timetable.times]
+    return record
+
+
+def _default(value):
+    if isinstance(value, datetime.datetime):
+        return value.isoformat(' ')
+    raise TypeError('{0!r} is not JSON serializable'.format(value))
+
+
+def _log(msg):
+    sys.stderr.write(msg + u'\n')
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,257 @@
+""":mod:`djuintra.codec` --- Compact binary format for parsed records
+~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+This module encodes lists of :class:`djuintra.TimeTable`,
+:class:`djuintra.Schedule` and :class:`djuintra.Scores` into bytes for caches
+and inter-process messages.
+
+Records are stored column by column, and every string is stored only once
+in a string table so repeated professor names, divisions and class names
+cost a few bytes each.
+
+.. code-block:: python
+
+   >>> from djuintra import codec
+   >>> data = codec.dumps(da.get_timetables(2014, 2, 0, '00000', 0))
+   >>> timetables = codec.loads(data)
+
+"""
+import datetime
+import struct
+from array import array
+
+from . import Schedule, Score, Scores, Semester, TimePlace, TimeTable
+from .util import pack_array, unpack_array
+
+__all__ = ('dumps', 'loads')
+
+
+MAGIC = b'DJU\x01'
+
+_HEADER = struct.Struct('<4sBcII')
+
+_EPOCH = datetime.datetime(1970, 1, 1)
+_NULL_INT = -2 ** 31
+_NULL_DATETIME = -2 ** 63
+
+_STR, _INT, _FLOAT, _DATETIME, _LIST = range(5)
+
+
+class _Schema(object):
+
+    def __init__(self, cls, fields):
+        self.cls = cls
+        self.fields = fields
+
+
+_TIMEPLACE = _Schema(TimePlace, ((_STR, None), (_STR, None)))
+
+_TIMETABLE = _Schema(TimeTable, (
+    (_INT, None),  # grade
+    (_STR, None),  # division
+    (_STR, None),  # code
+    (_STR, None),  # classcode
+    (_STR, None),  # classtype
+    (_STR, None),  # classname
+    (_INT, None),  # score
+    (_INT, None),  # time
+    (_STR, None),  # minor
+    (_STR, None),  # profname
+    (_LIST, _TIMEPLACE),  # times
+    (_INT, None),  # maxstudents
+    (_STR, None),  # available
+))
+
+_SCHEDULE = _Schema(Schedule, (
+    (_STR, None),  # title
+    (_DATETIME, None),  # start
+    (_DATETIME, None),  # end
+    (_STR, None),  # depart
+))
+
+_SCORE = _Schema(Score, (
+    (_STR, None),  # code
+    (_STR, None),  # title
+    (_FLOAT, None),  # point
+    (_STR, None),  # score
+))
+
+_SEMESTER = _Schema(Semester, ((_STR, None), (_LIST, _SCORE)))
+
+_SCORES = _Schema(Scores, ((_FLOAT, None), (_LIST, _SEMESTER)))
+
+_SCHEMAS = {
+    1: _TIMETABLE,
+    2: _SCHEDULE,
+    3: _SCORES,
+}
+
+_TAGS = dict((schema.cls, tag) for tag, schema in _SCHEMAS.items())
+
+
+def dumps(records, cls=None):
+    """Encode records into bytes.
+
+    Lazy iterables in records like :attr:`djuintra.Semester.scores` are
+    consumed while encoding.
+
+    :param records: :class:`djuintra.TimeTable`, :class:`djuintra.Schedule`
+                    or :class:`djuintra.Scores` records of the same type
+    :type records: :class:`collections.Iterable`
+
+    :param cls: Type of records. Required if ``records`` is empty.
+    :type cls: :class:`type`
+
+    :rtype: :class:`bytes`
+
+    """
+    records = list(records)
+    if cls is None:
+        if not records:
+            raise ValueError('cls is required for empty records')
+        cls = type(records[0])
+
+    try:
+        tag = _TAGS[cls]
+    except KeyError:
+        raise TypeError('Unsupported record type: {0}'.format(cls.__name__))
+
+    writer = _Writer()
+    writer.write(_SCHEMAS[tag], records)
+
+    strings = [s.encode('utf-8') for s in writer.strings[1:]]
+    index_type = _index_type(len(writer.strings))
+    chunks = [_HEADER.pack(MAGIC, tag, index_type.encode('ascii'),
+                           len(records), len(strings)),
+              pack_array('I', map(len, strings))]
+    chunks.extend(strings)
+    chunks.extend(pack_array(index_type, chunk)
+                  if isinstance(chunk, list) else chunk
+                  for chunk in writer.chunks)
+    return b''.join(chunks)
+
+
+def loads(data):
+    """Decode records encoded by :func:`dumps`.
+
+    Nested iterables like :attr:`djuintra.Semester.scores` are decoded as
+    :class:`list`.
+
+    :param data: Encoded records
+    :type data: :class:`bytes`
+
+    :rtype: :class:`list`
+
+    """
+    magic, tag, index_type, count, string_count = _HEADER.unpack_from(data)
+    if magic != MAGIC or tag not in _SCHEMAS:
+        raise ValueError('Not a djuintra.codec data')
+
+    reader = _Reader(data, _HEADER.size, index_type.decode('ascii'))
+    strings = [None]
+    for length in reader.array('I', string_count):
+        offset = reader.offset
+        reader.offset += length
+        strings.append(data[offset:reader.offset].decode('utf-8'))
+    reader.strings = strings
+
+    return reader.read(_SCHEMAS[tag], count)
+
+
+class _Writer(object):
+
+    def __init__(self):
+        # Index 0 is reserved for None.
+        self.strings = [None]
+        self.index = {None: 0}
+        self.chunks = []
+
+    def write(self, schema, records):
+        columns = list(zip(*records)) or [()] * len(schema.fields)
+        for (kind, sub), column in zip(schema.fields, columns):
+            if kind == _STR:
+                # Packed by dumps() once the size of string table is known.
+                self.chunks.append(self.intern(column))
+            elif kind == _INT:
+                self.chunks.append(pack_array('i', [
+                    _NULL_INT if value is None else value
+                    for value in column]))
+            elif kind == _FLOAT:
+                self.chunks.append(pack_array('d', column))
+            elif kind == _DATETIME:
+                self.chunks.append(pack_array('q', [
+                    _NULL_DATETIME if value is None else
+                    _microseconds(value - _EPOCH)
+                    for value in column]))
+            elif kind == _LIST:
+                items = [list(value) for value in column]
+                self.chunks.append(pack_array('I', map(len, items)))
+                self.write(sub, [item for value in items for item in value])
+
+    def intern(self, column):
+        index = self.index
+        strings = self.strings
+        result = []
+        for value in column:
+            try:
+                result.append(index[value])
+            except KeyError:
+                index[value] = len(strings)
+                result.append(len(strings))
+                strings.append(value)
+        return result
+
+
+class _Reader(object):
+
+    def __init__(self, data, offset, index_type):
+        self.data = data
+        self.offset = offset
+        self.index_type = index_type
+        self.strings = None
+
+    def array(self, typecode, count):
+        result, self.offset = unpack_array(typecode, self.data, self.offset,
+                                           count)
+        return result
+
+    def read(self, schema, count):
+        columns = []
+        for kind, sub in schema.fields:
+            if kind == _STR:
+                columns.append(list(map(self.strings.__getitem__,
+                                        self.array(self.index_type,
+                                                   count))))
+            elif kind == _INT:
+                columns.append([None if value == _NULL_INT else value
+                                for value in self.array('i', count)])
+            elif kind == _FLOAT:
+                columns.append(self.array('d', count).tolist())
+            elif kind == _DATETIME:
+                columns.append([
+                    None if value == _NULL_DATETIME else
+                    _EPOCH + datetime.timedelta(microseconds=value)
+                    for value in self.array('q', count)])
+            elif kind == _LIST:
+                lengths = self.array('I', count)
+                items = self.read(sub, sum(lengths))
+                column = []
+                start = 0
+                for length in lengths:
+                    column.append(items[start:start + length])
+                    start += length
+                columns.append(column)
+
+        return list(map(schema.cls._make, zip(*columns)))
+
+
+def _index_type(size):
+    for typecode in ('B', 'H'):
+        if size <= 2 ** (8 * array(typecode).itemsize):
+            return typecode
+    return 'I'
+
+
+def _microseconds(delta):
+    return ((delta.days * 86400 + delta.seconds) * 1000000 +
+            delta.microseconds)
@@ -0,0 +1,134 @@
+""":mod:`djuintra.dispatch` --- Simulated toeic application for many accounts
+~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+This module applies simulated toeic for many accounts concurrently. Forms
+are scraped before the window opens, and every account submits its form at
+the opening time.
+
+.. code-block:: python
+
+   >>> from djuintra.dispatch import ToeicDispatcher
+   >>> dispatcher = ToeicDispatcher(agents, workers=64)
+   >>> dispatcher.prepare()
+   >>> for result in dispatcher.dispatch(at=opening_time):
+   ...     print(result.userid, result.error or 'OK')
+
+"""
+import datetime
+import functools
+import threading
+import time
+from collections import namedtuple
+from multiprocessing.pool import ThreadPool
+
+__all__ = ('ToeicDispatcher', 'ToeicResult')
+
+
+ToeicResult = namedtuple('ToeicResult', ('userid', 'error', 'elapsed'))
+
+
+class ToeicDispatcher(object):
+    """Run :meth:`djuintra.DjuAgent.register_toeic` for many accounts with
+    bounded parallelism.
+
+    :param agents: Pairs of user id and logged in agent. A :class:`dict` is
+                   also accepted.
+    :type agents: :class:`collections.Iterable`
+
+    :param workers: How many accounts apply at once
+    :type workers: :class:`int`
+
+    """
+
+    def __init__(self, agents, workers=32):
+        if isinstance(agents, dict):
+            agents = agents.items()
+        self.agents = list(agents)
+        self.workers = workers
+        #: Scraped forms, keyed by user id.
+        self.forms = {}
+
+    def prepare(self):
+        """Scrape forms of every account before the window opens.
+
+        Accounts whose form is not available yet scrape it again when
+        :meth:`dispatch` submits.
+
+        :returns: user id to error message of accounts failed to scrape
+        :rtype: :class:`dict`
+
+        """
+        errors = {}
+        for userid, form, error in self._map(self._prepare, self.agents):
+            if error is None:
+                self.forms[userid] = form
+            else:
+                errors[userid] = error
+        return errors
+
+    def dispatch(self, at=None):
+        """Submit forms of every account.
+
+        Workers are started before the window opens and wait until ``at``,
+        so starting threads does not delay the first submissions. Scraped
+        forms are used only once, and :meth:`prepare` should be called
+        again before the next dispatch.
+
+        :param at: Opening time of the window. Submits right now if it is
+                   not given.
+        :type at: :class:`datetime.datetime`
+
+        :returns: result of each account in the order of :attr:`agents`
+        :rtype: :class:`list` of :class:`ToeicResult`
+
+        """
+        opened = threading.Event()
+        pool = self._pool()
+        try:
+            results = pool.map_async(functools.partial(self._submit, opened),
+                                     self.agents, chunksize=1)
+            if at is not None:
+                delay = (at - datetime.datetime.now()).total_seconds()
+                if delay > 0:
+                    time.sleep(delay)
+            opened.set()
+            return results.get()
+        finally:
+            opened.set()
+            pool.close()
+            pool.join()
+            self.forms.clear()
+
+    def _pool(self):
+        return ThreadPool(max(1, min(self.workers, len(self.agents))))
+
+    def _map(self, func, items):
+        pool = self._pool()
+        try:
+            return pool.map(func, items)
+        finally:
+            pool.close()
+            pool.join()
+
+    def _prepare(self, item):
+        userid, agent = item
+        try:
+            return (userid, agent.prepare_toeic(), None)
+        except Exception as e:
+            return (userid, None, str(e))
+
+    def _submit(self, opened, item):
+        userid, agent = item
+        opened.wait()
+        started = time.time()
+        try:
+            form = self.forms.get(userid)
+            if form is None:
+                agent.register_toeic()
+            else:
+                agent.submit_toeic(form)
+        except Exception as e:
+            error = str(e)
+        else:
+            error = None
+        return ToeicResult(userid, error, time.time() - started)
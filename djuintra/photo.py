@@ -0,0 +1,295 @@
+""":mod:`djuintra.photo` --- Local cache of user photos
+~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+This module downloads user photos concurrently and keeps them in a
+content-addressed directory, so the same photo is stored only once. Least
+recently used photos are removed when the cache gets bigger than its limit.
+
+Thumbnails need Pillow. Install it with ``pip install dju-intranet[photo]``.
+
+.. code-block:: python
+
+   >>> from djuintra.photo import PhotoCache
+   >>> cache = PhotoCache('/var/cache/djuintra', thumbnail_size=(60, 80))
+   >>> paths = cache.fetch(['20141234', '20145678'])
+   >>> thumbnail = cache.get_thumbnail('20141234')
+
+"""
+import errno
+import hashlib
+import os
+import threading
+import time
+from multiprocessing.pool import ThreadPool
+
+import requests
+
+from .util import get_photo_urls
+
+try:
+    from PIL import Image
+except ImportError:
+    Image = None
+
+__all__ = ('PhotoCache',)
+
+
+#: :meth:`PhotoCache._lookup` result of users known to have no photo.
+_NO_PHOTO = object()
+
+
+class PhotoCache(object):
+    """Download user photos into a local directory.
+
+    Photos are stored as ``blobs/<sha1>.jpg`` and ``refs/<userid>`` has the
+    hash of the user's photo. ``refs/<userid>`` is empty if the user has no
+    photo, so it is not requested again.
+
+    :param directory: Directory for cached photos
+    :type directory: :class:`str`
+
+    :param max_size: Limit of total size of photos and their thumbnails in
+                     bytes. Photos returned
+                     by the same call are never removed, so a batch bigger
+                     than the limit can exceed it until the next call.
+    :type max_size: :class:`int`
+
+    :param thumbnail_size: Size of thumbnails like ``(60, 80)``.
+                           Thumbnails are not made if it is :const:`None`.
+    :type thumbnail_size: :class:`tuple`
+
+    :param workers: How many photos are downloaded at once
+    :type workers: :class:`int`
+
+    :param session: Session for downloading
+    :type session: :class:`requests.Session`
+
+    """
+
+    def __init__(self, directory, max_size=512 * 1024 * 1024,
+                 thumbnail_size=None, workers=8, session=None):
+        if thumbnail_size and Image is None:
+            raise ImportError('Pillow is required for thumbnails')
+
+        self.directory = directory
+        self.max_size = max_size
+        self.thumbnail_size = thumbnail_size
+        self.workers = workers
+        self.session = session or requests.session()
+        self._lock = threading.Lock()
+
+        for name in ('blobs', 'refs', 'thumbs'):
+            _makedirs(os.path.join(directory, name))
+
+        # digest -> [size, last used]
+        self._blobs = {}
+        # thumbnail filename -> size
+        self._thumbs = {}
+        self._size = 0
+        for filename in os.listdir(os.path.join(directory, 'blobs')):
+            digest, ext = os.path.splitext(filename)
+            if ext != '.jpg':
+                continue
+            stat = os.stat(self._blob_path(digest))
+            self._blobs[digest] = [stat.st_size, stat.st_mtime]
+            self._size += stat.st_size
+        for filename in os.listdir(os.path.join(directory, 'thumbs')):
+            if not filename.endswith('.jpg'):
+                continue
+            path = os.path.join(directory, 'thumbs', filename)
+            if filename.partition('-')[0] not in self._blobs:
+                # Left behind by an interrupted eviction.
+                _remove(path)
+                continue
+            size = os.path.getsize(path)
+            self._thumbs[filename] = size
+            self._size += size
+
+    def get(self, userid):
+        """Get path of the user's photo, downloading it if not cached.
+
+        :param userid: User id
+        :type userid: :class:`str`
+
+        :returns: path of the photo, or :const:`None` if there is no photo
+        :rtype: :class:`str`
+
+        """
+        return self.fetch([userid])[str(userid)]
+
+    def fetch(self, userids):
+        """Get paths of many users' photos, downloading not cached ones
+        concurrently.
+
+        :param userids: User ids
+        :type userids: :class:`collections.Iterable`
+
+        :returns: user id to path of the photo, or :const:`None` if there is
+                  no photo
+        :rtype: :class:`dict`
+
+        """
+        userids = [str(userid) for userid in userids]
+        paths = {}
+        missing = []
+        for userid in userids:
+            path = self._lookup(userid)
+            if path is None:
+                missing.append(userid)
+            elif path is _NO_PHOTO:
+                paths[userid] = None
+            else:
+                paths[userid] = path
+
+        if missing:
+            pool = ThreadPool(min(self.workers, len(missing)))
+            try:
+                paths.update(zip(missing, pool.map(
+                    self._download, zip(missing, get_photo_urls(missing)))))
+            finally:
+                pool.close()
+                pool.join()
+
+        self._evict(keep=set(_digest(path) for path in paths.values() if path))
+        return paths
+
+    def get_thumbnail(self, userid):
+        """Get path of the thumbnail of the user's photo.
+
+        :param userid: User id
+        :type userid: :class:`str`
+
+        :returns: path of the thumbnail, or :const:`None` if there is no photo
+        :rtype: :class:`str`
+
+        """
+        if not self.thumbnail_size:
+            raise ValueError('thumbnail_size is not set')
+
+        path = self.get(userid)
+        if path is None:
+            return None
+
+        digest = _digest(path)
+        filename = '{0}-{1}x{2}.jpg'.format(digest, *self.thumbnail_size)
+        thumb_path = os.path.join(self.directory, 'thumbs', filename)
+        if not os.path.exists(thumb_path):
+            image = Image.open(path)
+            image.thumbnail(self.thumbnail_size)
+            tmp_path = _tmp_path(thumb_path)
+            image.convert('RGB').save(tmp_path, 'JPEG')
+            os.rename(tmp_path, thumb_path)
+            size = os.path.getsize(thumb_path)
+            with self._lock:
+                if filename not in self._thumbs:
+                    self._thumbs[filename] = size
+                    self._size += size
+            self._evict(keep=(digest,))
+        return thumb_path
+
+    def _blob_path(self, digest):
+        return os.path.join(self.directory, 'blobs', digest + '.jpg')
+
+    def _ref_path(self, userid):
+        return os.path.join(self.directory, 'refs', userid)
+
+    def _lookup(self, userid):
+        try:
+            with open(self._ref_path(userid)) as f:
+                digest = f.read().strip()
+        except IOError:
+            return None
+        if not digest:
+            return _NO_PHOTO
+
+        with self._lock:
+            blob = self._blobs.get(digest)
+            if blob is None:
+                return None
+            blob[1] = time.time()
+        path = self._blob_path(digest)
+        try:
+            os.utime(path, None)
+        except OSError:
+            return None
+        return path
+
+    def _download(self, args):
+        userid, url = args
+        response = self.session.get(url)
+        if response.status_code == 404:
+            _write_atomic(self._ref_path(userid), '', 'w')
+            return None
+        response.raise_for_status()
+
+        content = response.content
+        digest = hashlib.sha1(content).hexdigest()
+        path = self._blob_path(digest)
+
+        with self._lock:
+            blob = self._blobs.get(digest)
+            if blob is not None:
+                blob[1] = time.time()
+        if blob is None:
+            _write_atomic(path, content, 'wb')
+            with self._lock:
+                if digest not in self._blobs:
+                    self._blobs[digest] = [len(content), time.time()]
+                    self._size += len(content)
+        _write_atomic(self._ref_path(userid), digest, 'w')
+        return path
+
+    def _evict(self, keep=()):
+        with self._lock:
+            if self._size <= self.max_size:
+                return
+            victims = []
+            for digest, (size, last_used) in sorted(
+                    self._blobs.items(), key=lambda item: item[1][1]):
+                if self._size <= self.max_size:
+                    break
+                if digest in keep:
+                    continue
+                del self._blobs[digest]
+                self._size -= size
+                thumbs = [filename for filename in self._thumbs
+                          if filename.startswith(digest + '-')]
+                for filename in thumbs:
+                    self._size -= self._thumbs.pop(filename)
+                victims.append((digest, thumbs))
+
+        for digest, thumbs in victims:
+            _remove(self._blob_path(digest))
+            for filename in thumbs:
+                _remove(os.path.join(self.directory, 'thumbs', filename))
+
+
+def _digest(path):
+    return os.path.splitext(os.path.basename(path))[0]
+
+
+def _makedirs(path):
+    try:
+        os.makedirs(path)
+    except OSError as e:
+        if e.errno != errno.EEXIST:
+            raise
+
+
+def _tmp_path(path):
+    return '{0}.{1}.{2}.tmp'.format(
+        path, os.getpid(), threading.current_thread().ident)
+
+
+def _write_atomic(path, content, mode):
+    tmp_path = _tmp_path(path)
+    with open(tmp_path, mode) as f:
+        f.write(content)
+    os.rename(tmp_path, path)
+
+
+def _remove(path):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
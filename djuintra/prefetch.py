@@ -0,0 +1,232 @@
+# -*- coding: utf-8 -*-
+""":mod:`djuintra.prefetch` --- Prefetch before registration windows
+~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+Course registration and TOEIC application windows are listed in
+:meth:`djuintra.DjuAgent.get_schedules`. This module reads them and does the
+expensive work before each window opens. Timetables are crawled into a cache
+well ahead of course registration windows, while accounts are logged in again
+and connections are warmed just before any window opens, so cookies are fresh
+and idle connections are not closed yet.
+
+"""
+import datetime
+import logging
+import sched
+import time
+from collections import namedtuple
+
+from . import DjuAgent
+
+__all__ = ('PrefetchJob', 'PrefetchScheduler')
+
+logger = logging.getLogger(__name__)
+
+
+PrefetchJob = namedtuple('PrefetchJob', ('at', 'schedule', 'task'))
+
+#: Tasks of :class:`PrefetchJob` in the order they run at the same time.
+TASKS = ('crawl', 'refresh', 'warm')
+
+
+class PrefetchScheduler(object):
+    """Run prefetch jobs ahead of registration windows.
+
+    :param agent: Agent for reading schedules and crawling timetables
+    :type agent: :class:`djuintra.DjuAgent`
+
+    :param timetables: Arguments of :meth:`djuintra.DjuAgent.get_timetables`
+                       to crawl, like ``[(2014, 2, 0, '00000', 0)]``
+    :type timetables: :class:`collections.Iterable`
+
+    :param accounts: Pairs of user id and password to log in again
+    :type accounts: :class:`collections.Iterable`
+
+    :param lead: How early timetables are crawled before a course
+                 registration window opens
+    :type lead: :class:`datetime.timedelta`
+
+    :param refresh_lead: How early accounts log in again before a window
+                         opens
+    :type refresh_lead: :class:`datetime.timedelta`
+
+    :param warm_lead: How early connections are warmed before a window
+                      opens. It should be shorter than the keep-alive
+                      timeout of the intranet.
+    :type warm_lead: :class:`datetime.timedelta`
+
+    :param keywords: Schedules whose title contains one of them are windows
+    :type keywords: :class:`collections.Iterable`
+
+    :param course_keywords: Windows whose title contains one of them are
+                            course registration windows, which timetables
+                            are crawled for
+    :type course_keywords: :class:`collections.Iterable`
+
+    :param agent_class: Class for agents of ``accounts``
+    :type agent_class: :class:`type`
+
+    """
+
+    KEYWORDS = (u'수강신청', u'토익')
+
+    COURSE_KEYWORDS = (u'수강신청',)
+
+    def __init__(self, agent, timetables=(), accounts=(),
+                 lead=datetime.timedelta(minutes=30),
+                 refresh_lead=datetime.timedelta(minutes=2),
+                 warm_lead=datetime.timedelta(seconds=5), keywords=KEYWORDS,
+                 course_keywords=COURSE_KEYWORDS, agent_class=DjuAgent):
+        self.agent = agent
+        self.timetables = [tuple(args) for args in timetables]
+        self.accounts = list(accounts)
+        self.lead = lead
+        self.refresh_lead = refresh_lead
+        self.warm_lead = warm_lead
+        self.keywords = tuple(keywords)
+        self.course_keywords = tuple(course_keywords)
+        self.agent_class = agent_class
+        #: Crawled timetables, keyed by arguments of ``get_timetables``.
+        self.cache = {}
+        #: Logged in agents, keyed by user id.
+        self.agents = {}
+        self._scheduler = sched.scheduler(time.time, time.sleep)
+
+    def is_window(self, schedule):
+        """Whether the schedule is a window to prefetch for.
+
+        :param schedule: a schedule
+        :type schedule: :class:`djuintra.Schedule`
+
+        :rtype: :class:`bool`
+
+        """
+        return any(keyword in schedule.title for keyword in self.keywords)
+
+    def is_course_window(self, schedule):
+        """Whether the schedule is a course registration window, which
+        timetables are crawled for.
+
+        :param schedule: a schedule
+        :type schedule: :class:`djuintra.Schedule`
+
+        :rtype: :class:`bool`
+
+        """
+        return (self.is_window(schedule) and
+                any(keyword in schedule.title
+                    for keyword in self.course_keywords))
+
+    def plan(self, schedules=None, now=None):
+        """Plan prefetch jobs for windows not opened yet.
+
+        Each window gets ``refresh`` and ``warm`` jobs, and course
+        registration windows also get a ``crawl`` job. If the lead time of
+        a job already passed, the job runs right now.
+
+        :param schedules: Schedules to read. Fetched by :attr:`agent` if not
+                          given.
+        :type schedules: :class:`collections.Iterable`
+
+        :param now: Current time
+        :type now: :class:`datetime.datetime`
+
+        :returns: jobs sorted by time
+        :rtype: :class:`list` of :class:`PrefetchJob`
+
+        """
+        if schedules is None:
+            schedules = self.agent.get_schedules()
+        now = now or datetime.datetime.now()
+
+        jobs = []
+        for schedule in schedules:
+            if not self.is_window(schedule) or schedule.start <= now:
+                continue
+            if self.timetables and self.is_course_window(schedule):
+                jobs.append(PrefetchJob(
+                    max(schedule.start - self.lead, now), schedule, 'crawl'))
+            if self.accounts:
+                jobs.append(PrefetchJob(
+                    max(schedule.start - self.refresh_lead, now), schedule,
+                    'refresh'))
+            jobs.append(PrefetchJob(
+                max(schedule.start - self.warm_lead, now), schedule, 'warm'))
+        jobs.sort(key=lambda job: (job.at, TASKS.index(job.task)))
+        return jobs
+
+    def schedule(self, schedules=None, now=None):
+        """Plan prefetch jobs and queue them to be run by :meth:`run`.
+
+        :returns: queued jobs
+        :rtype: :class:`list` of :class:`PrefetchJob`
+
+        """
+        jobs = self.plan(schedules, now)
+        for job in jobs:
+            self._scheduler.enterabs(
+                time.mktime(job.at.timetuple()), TASKS.index(job.task),
+                self.prefetch, (job,))
+        return jobs
+
+    def run(self):
+        """Block until every queued job is done."""
+        self._scheduler.run()
+
+    def prefetch(self, job=None):
+        """Run the task of the job. Crawl timetables, log accounts in and
+        warm connections if no job is given.
+
+        :param job: the job which triggered this prefetch
+        :type job: :class:`PrefetchJob`
+
+        """
+        if job is None:
+            for task in TASKS:
+                getattr(self, task)()
+            return
+        logger.info(u'Prefetching %s for %s', job.task, job.schedule.title)
+        getattr(self, job.task)()
+
+    def crawl(self):
+        """Crawl :attr:`timetables` into :attr:`cache`."""
+        for args in self.timetables:
+            try:
+                self.cache[args] = list(self.agent.get_timetables(*args))
+            except Exception:
+                logger.exception('Failed to crawl timetables %r', args)
+
+    def refresh(self):
+        """Log :attr:`accounts` in again to refresh their cookies."""
+        for userid, userpw in self.accounts:
+            try:
+                agent = self.agents.get(userid)
+                if agent is None:
+                    agent = self.agent_class()
+                agent.login(userid, userpw)
+                self.agents[userid] = agent
+            except Exception:
+                logger.exception('Failed to log %s in', userid)
+
+    def warm(self):
+        """Open connections to the intranet for every agent."""
+        for agent in [self.agent] + list(self.agents.values()):
+            try:
+                agent.session.get(agent.URL_LOGIN_REFERER)
+            except Exception:
+                logger.exception('Failed to warm connections')
+
+    def get_timetables(self, year, semester, isbreak, departcode, category):
+        """Same as :meth:`djuintra.DjuAgent.get_timetables` but returns
+        prefetched timetables if they are cached.
+
+        :rtype: :class:`list` of :class:`djuintra.TimeTable`
+
+        """
+        args = (year, semester, isbreak, departcode, category)
+        try:
+            return self.cache[args]
+        except KeyError:
+            timetables = list(self.agent.get_timetables(*args))
+            self.cache[args] = timetables
+            return timetables
@@ -0,0 +1,213 @@
+""":mod:`djuintra.snapshot` --- Changes of timetables between crawls
+~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+A snapshot keeps only hashes of timetable rows keyed by ``(code, classcode)``,
+so it stays small even for the whole catalog. Diffing the current crawl
+against the previous snapshot gives added, removed and modified rows.
+
+.. code-block:: python
+
+   >>> from djuintra.snapshot import Snapshot
+   >>> current = Snapshot.from_timetables(
+   ...     da.get_timetables(2014, 2, 0, '00000', 0))
+   >>> changes = current.diff(Snapshot.load('timetables.snapshot'))
+   >>> for modification in changes.modified:
+   ...     print(modification.key, modification.fields)
+   >>> current.save('timetables.snapshot')
+
+"""
+import errno
+import hashlib
+import os
+import struct
+import zlib
+from collections import namedtuple
+
+from . import TimeTable
+from .util import pack_array, unpack_array
+
+__all__ = ('ChangeSet', 'Modification', 'Snapshot')
+
+
+MAGIC = b'DJS\x01'
+
+_HEADER = struct.Struct('<4sII')
+
+_KEY_SEPARATOR = u'\x1f'
+
+
+ChangeSet = namedtuple('ChangeSet', ('added', 'removed', 'modified'))
+Modification = namedtuple('Modification', ('key', 'timetable', 'fields'))
+
+
+class Snapshot(object):
+    """Hashes of timetable rows.
+
+    :param hashes: ``(code, classcode)`` to a pair of row hash and tuple of
+                   field hashes
+    :type hashes: :class:`dict`
+
+    :param timetables: ``(code, classcode)`` to :class:`djuintra.TimeTable`.
+                       Only snapshots made by :meth:`from_timetables` have
+                       them.
+    :type timetables: :class:`dict`
+
+    """
+
+    FIELDS = TimeTable._fields
+
+    def __init__(self, hashes=None, timetables=None):
+        self.hashes = hashes or {}
+        self.timetables = timetables or {}
+
+    @classmethod
+    def from_timetables(cls, timetables):
+        """Make a snapshot of crawled timetables.
+
+        If there are rows with the same key, the last one is used.
+
+        :param timetables: Crawled timetables
+        :type timetables: :class:`collections.Iterable`
+
+        :rtype: :class:`Snapshot`
+
+        """
+        hashes = {}
+        rows = {}
+        for timetable in timetables:
+            key = (timetable.code, timetable.classcode)
+            hashes[key] = _hash(timetable)
+            rows[key] = timetable
+        return cls(hashes, rows)
+
+    def __len__(self):
+        return len(self.hashes)
+
+    def diff(self, previous):
+        """Changes from the previous snapshot to this snapshot.
+
+        :param previous: Snapshot of the previous crawl
+        :type previous: :class:`Snapshot`
+
+        :returns: added :class:`djuintra.TimeTable` rows, removed keys and
+                  :class:`Modification` with names of changed fields
+        :rtype: :class:`ChangeSet`
+
+        """
+        if not self.timetables and self.hashes:
+            raise ValueError('Snapshot has no timetables to diff')
+
+        added = []
+        modified = []
+        old_hashes = previous.hashes
+
+        for key, (row_hash, field_hashes) in self.hashes.items():
+            try:
+                old_row_hash, old_field_hashes = old_hashes[key]
+            except KeyError:
+                added.append(self.timetables[key])
+                continue
+            if row_hash == old_row_hash:
+                continue
+            fields = tuple(
+                name for name, new, old
+                in zip(self.FIELDS, field_hashes, old_field_hashes)
+                if new != old)
+            modified.append(Modification(key, self.timetables[key], fields))
+
+        removed = [key for key in old_hashes if key not in self.hashes]
+
+        return ChangeSet(added, removed, modified)
+
+    def dumps(self):
+        """Encode hashes of this snapshot into bytes.
+
+        :rtype: :class:`bytes`
+
+        """
+        keys = list(self.hashes)
+        encoded_keys = [
+            _KEY_SEPARATOR.join(key).encode('utf-8') for key in keys]
+        row_hashes = []
+        field_hashes = []
+        for key in keys:
+            row_hash, fields = self.hashes[key]
+            row_hashes.append(row_hash)
+            field_hashes.extend(fields)
+
+        chunks = [_HEADER.pack(MAGIC, len(keys), len(self.FIELDS)),
+                  pack_array('I', map(len, encoded_keys))]
+        chunks.extend(encoded_keys)
+        chunks.append(pack_array('Q', row_hashes))
+        chunks.append(pack_array('I', field_hashes))
+        return b''.join(chunks)
+
+    @classmethod
+    def loads(cls, data):
+        """Decode a snapshot encoded by :meth:`dumps`.
+
+        :rtype: :class:`Snapshot`
+
+        """
+        magic, count, field_count = _HEADER.unpack_from(data)
+        if magic != MAGIC:
+            raise ValueError('Not a djuintra.snapshot data')
+        if field_count != len(cls.FIELDS):
+            raise ValueError('Snapshot was made with other fields')
+
+        offset = _HEADER.size
+        lengths, offset = unpack_array('I', data, offset, count)
+        keys = []
+        for length in lengths:
+            key = data[offset:offset + length].decode('utf-8')
+            keys.append(tuple(key.split(_KEY_SEPARATOR)))
+            offset += length
+        row_hashes, offset = unpack_array('Q', data, offset, count)
+        field_hashes, offset = unpack_array('I', data, offset,
+                                            count * field_count)
+
+        hashes = {}
+        for idx, key in enumerate(keys):
+            start = idx * field_count
+            hashes[key] = (row_hashes[idx],
+                           tuple(field_hashes[start:start + field_count]))
+        return cls(hashes)
+
+    def save(self, path):
+        """Save hashes of this snapshot to the file.
+
+        :param path: Path of the file
+        :type path: :class:`str`
+
+        """
+        tmp_path = '{0}.tmp'.format(path)
+        with open(tmp_path, 'wb') as f:
+            f.write(self.dumps())
+        os.rename(tmp_path, path)
+
+    @classmethod
+    def load(cls, path):
+        """Load a snapshot saved by :meth:`save`. Empty snapshot is returned
+        if there is no such file.
+
+        :param path: Path of the file
+        :type path: :class:`str`
+
+        :rtype: :class:`Snapshot`
+
+        """
+        try:
+            with open(path, 'rb') as f:
+                return cls.loads(f.read())
+        except IOError as e:
+            if e.errno != errno.ENOENT:
+                raise
+            return cls()
+
+
+def _hash(timetable):
+    values = [repr(value).encode('utf-8') for value in timetable]
+    row_hash = struct.unpack(
+        '<Q', hashlib.sha1(b'\0'.join(values)).digest()[:8])[0]
+    return row_hash, tuple(zlib.crc32(value) & 0xffffffff for value in values)
+
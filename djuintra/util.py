@@ -1,3 +1,30 @@
+import sys
+from array import array
+
+try:
+    _maketrans = bytes.maketrans
+except AttributeError:
+    from string import maketrans as _maketrans
+
+try:
+    _tobytes = array.tobytes
+    _frombytes = array.frombytes
+except AttributeError:
+    _tobytes = array.tostring
+    _frombytes = array.fromstring
+
+_INT64_TYPECODES = ('q', 'Q')
+
+# Python 2 has no 64-bit typecodes, so pack_array() encodes them as pairs of
+# 'I' in the same little-endian layout.
+try:
+    array('q')
+except ValueError:
+    _HAS_INT64 = False
+else:
+    _HAS_INT64 = True
+
+
 encode_map = {
     '0': 'W4-',
     '1': 'W1-',
@@ -11,7 +38,106 @@ encode_map = {
     '9': 'L7-',
 }
 
+PHOTO_URL = 'http://was81.dju.kr/photos/{}.jpg'
+_PHOTO_URL_PREFIX, _PHOTO_URL_SUFFIX = PHOTO_URL.split('{}')
+
+# Every digit is encoded to three characters, so each position of the codes
+# gets its own 1:1 translate table. ',' separates user ids.
+_digits = '0123456789'
+_encode_tables = [
+    _maketrans(
+        (_digits + ',').encode('ascii'),
+        (''.join(encode_map[digit][idx] for digit in _digits) +
+         ',').encode('ascii'))
+    for idx in range(3)
+]
+
 
 def get_photo_url(userid):
     encoded = ''.join(map(encode_map.get, str(userid)))
-    return 'http://was81.dju.kr/photos/{}.jpg'.format(encoded)
+    return PHOTO_URL.format(encoded)
+
+
+def get_photo_urls(userids):
+    """Get photo urls of many users at once.
+
+    :param userids: User ids
+    :type userids: :class:`collections.Iterable`
+
+    :returns: photo urls in the same order
+    :rtype: :class:`list`
+
+    """
+    encoded_ids = []
+    for userid in userids:
+        try:
+            encoded_id = str(userid).encode('ascii')
+        except UnicodeError:
+            encoded_id = b''
+        if not encoded_id.isdigit():
+            raise ValueError('User id must be digits: {0!r}'.format(userid))
+        encoded_ids.append(encoded_id)
+    if not encoded_ids:
+        return []
+    joined = b','.join(encoded_ids)
+
+    encoded = bytearray(len(joined) * 3)
+    for idx, table in enumerate(_encode_tables):
+        encoded[idx::3] = joined.translate(table)
+
+    urls = encoded.decode('ascii').replace(
+        ',,,', _PHOTO_URL_SUFFIX + ',' + _PHOTO_URL_PREFIX)
+    return (_PHOTO_URL_PREFIX + urls + _PHOTO_URL_SUFFIX).split(',')
+
+
+def pack_array(typecode, values):
+    """Encode values into little-endian bytes like :class:`array.array` of
+    the typecode.
+
+    :param typecode: Typecode of :mod:`array`. ``'q'`` and ``'Q'`` are also
+                     supported on Python 2.
+    :type typecode: :class:`str`
+
+    :param values: Values to encode
+    :type values: :class:`collections.Iterable`
+
+    :rtype: :class:`bytes`
+
+    """
+    if typecode in _INT64_TYPECODES and not _HAS_INT64:
+        values = array('I', [half for value in values
+                             for half in (value & 0xffffffff,
+                                          (value >> 32) & 0xffffffff)])
+    else:
+        values = array(typecode, values)
+    if sys.byteorder == 'big':
+        values.byteswap()
+    return _tobytes(values)
+
+
+def unpack_array(typecode, data, offset, count):
+    """Decode ``count`` values encoded by :func:`pack_array` from ``offset``.
+
+    :returns: decoded values and offset right after them. Values are an
+              :class:`array.array`, or a :class:`list` for ``'q'`` and
+              ``'Q'`` on Python 2.
+    :rtype: :class:`tuple`
+
+    """
+    if typecode in _INT64_TYPECODES and not _HAS_INT64:
+        halves, end = unpack_array('I', data, offset, count * 2)
+        values = [low | high << 32
+                  for low, high in zip(halves[::2], halves[1::2])]
+        if typecode == 'q':
+            values = [value - (1 << 64) if value >= 1 << 63 else value
+                      for value in values]
+        return values, end
+
+    values = array(typecode)
+    end = offset + values.itemsize * count
+    if end > len(data):
+        raise ValueError('Truncated data')
+    _frombytes(values, data[offset:end])
+    if sys.byteorder == 'big':
+        values.byteswap()
+    return values, end
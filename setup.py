@@ -13,6 +13,11 @@ install_requires = [
     'requests>=2.4.3',
 ]
 
+extras_require = {
+    'analytics': ['numpy>=1.7.0'],
+    'photo': ['Pillow>=2.0.0'],
+}
+
 
 setup(
     name='dju-intranet',
@@ -26,4 +31,10 @@ setup(
     py_modules=['djuintra'],
     zip_safe=False,
     install_requires=install_requires,
+    extras_require=extras_require,
+    entry_points={
+        'console_scripts': [
+            'djuintra = djuintra.cli:main',
+        ],
+    },
 )